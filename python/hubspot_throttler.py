@@ -1,6 +1,5 @@
 from dataclasses import InitVar, dataclass, field
 import random
-import time
 import requests
 from python.throttler import RequestThrottler
 
@@ -12,8 +11,6 @@ class _HubSpotThrottlerDefaultsBase:
     """Default values for the HubSpotThrottler class."""
     max_requests_in_window: int = 160  # per window
     rate_limit_window: int = 10  # in seconds
-    throttle_start_percentage: float = 0.75 # Start throttling at 75% of the limit
-    full_throttle_percentage: float = 0.90 # Fully throttle at 90% of the limit
 
 @dataclass
 class _HubSpotThrottlerBase:
@@ -34,53 +31,49 @@ class HubSpotThrottler(_HubSpotThrottlerDefaultsBase, RequestThrottler, _HubSpot
     def __post_init__(self, primary_api_key, backup_api_keys):
         """Initialize the throttler with the primary API key."""
         super().__post_init__()
-        self.current_api_key = primary_api_key
         self.backup_api_keys = backup_api_keys
-        self.is_server_providing_request_position = True
-        self.is_leaky_bucket = False
+        self._use_api_key(primary_api_key)
+
+    def _use_api_key(self, api_key):
+        """Authenticate requests with the given API key and share its rate limit with other throttlers using it."""
+        self.current_api_key = api_key
+        self._session.headers['Authorization'] = f'Bearer {api_key}'
+        self._share_bucket(api_key)
 
     def _switch_api_key(self):
         """Switch to a random backup API key when the current key is rate-limited."""
         all_keys = [self.current_api_key] + self.backup_api_keys
         available_keys = [key for key in all_keys if key != self.current_api_key]
         if available_keys:
-            self.current_api_key = random.choice(available_keys)
+            self._use_api_key(random.choice(available_keys))
 
-    def _update_rate_limits(self, response):
-        """Update the rate limits based on HubSpot's response headers."""
+    def _update_from_headers(self, response):
+        """Update the rate limits and remaining tokens based on HubSpot's response headers."""
+        max_requests_in_window = self.max_requests_in_window
+        rate_limit_window = self.rate_limit_window
+        has_limit_headers = False
+        if 'X-HubSpot-RateLimit-Max' in response.headers:
+            max_requests_in_window = int(response.headers['X-HubSpot-RateLimit-Max'])
+            has_limit_headers = True
         if 'X-HubSpot-RateLimit-Interval-Milliseconds' in response.headers:
-            self.rate_limit_window = int(response.headers['X-HubSpot-RateLimit-Interval-Milliseconds']) / 1000
-        
-        # Recalculate thresholds based on the updated rate limits
-        self._recalculate_throttle_thresholds()
-
-    def _make_request(self, method, url, headers=None, params=None, data=None, json=None, retries=4, backoff_factor=3):
-        """Make a request with retries using exponential backoff, jitter, and dynamic API key switching."""
-        headers = headers or {}
-        headers['Authorization'] = f'Bearer {self.current_api_key}'
+            rate_limit_window = int(response.headers['X-HubSpot-RateLimit-Interval-Milliseconds']) / 1000
+            has_limit_headers = True
 
-        for attempt in range(retries):
-            self._throttle()
-
-            try:
-                response = super()._make_request(
-                    method, url, headers=headers, params=params, data=data, json=json, retries=3
-                )
-                self.request_position = int(response.headers.get('X-HubSpot-RateLimit-Max', '150')) - int(response.headers.get('X-HubSpot-RateLimit-Remaining', '150'))
-                self._record_request()
-                self._update_rate_limits(response)
-                return response
+        # Compare against the bucket, which another throttler sharing the API key may have updated
+        if has_limit_headers and not self._has_bucket_limits(max_requests_in_window, rate_limit_window):
+            self.update_limits(max_requests_in_window, rate_limit_window)
+        
+        # HubSpot's remaining count can only lower the local estimate
+        if 'X-HubSpot-RateLimit-Remaining' in response.headers:
+            self.bucket.reset(int(response.headers['X-HubSpot-RateLimit-Remaining']))
 
-            except requests.exceptions.HTTPError as http_err:
-                if http_err.response.status_code == 429:
-                    self._switch_api_key()
-                    retry_after = int(http_err.response.headers.get('Retry-After', 0))
-                    time.sleep(retry_after if retry_after else (backoff_factor ** attempt) + random.uniform(0, 1))
-                else:
-                    raise
+    def _on_transient_error(self, error):
+        """Switch API keys when HubSpot rate-limits the current key."""
+        if isinstance(error, requests.exceptions.HTTPError) and error.response.status_code == 429:
+            self._switch_api_key()
 
-            except requests.exceptions.RequestException:
-                if attempt < retries - 1:
-                    time.sleep((backoff_factor ** attempt) + random.uniform(0, 1))
-                else:
-                    raise
+    def _make_request(self, method, url, headers=None, params=None, data=None, json=None, retries=4, backoff_factor=3):
+        """Make a request with HubSpot's retry defaults."""
+        return super()._make_request(
+            method, url, headers=headers, params=params, data=data, json=json, retries=retries, backoff_factor=backoff_factor
+        )
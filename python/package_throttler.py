@@ -1,11 +1,14 @@
-from collections import deque
+from array import array
 from dataclasses import dataclass, field
-from pprint import pprint
+from functools import cached_property
 from requests.exceptions import HTTPError, ConnectionError, Timeout
+import logging
 import math
 import random
 import time
 
+log = logging.getLogger(__name__)
+
 @dataclass
 class _PackageThrottlerDefaultsBase:
     """Default values for the PackageThrottler class."""
@@ -35,91 +38,130 @@ class PackageThrottler(_PackageThrottlerDefaultsBase, _PackageThrottlerBase):
         base_backoff_delay (float): The base delay in seconds for exponential backoff.
     """
 
-    throttle_trigger_count: int = field(init=False)
-    full_throttle_trigger_count: int = field(init=False)
-    operation_timestamps: deque = field(default_factory=deque, init=False)
+    operation_timestamps: array = field(init=False, repr=False)
+    timestamps_head: int = field(default=0, init=False, repr=False)
+    timestamps_tail: int = field(default=0, init=False, repr=False)
     total_operations_made: int = field(default=0, init=False)
-    window_start_time: float = field(default_factory=time.time, init=False)
+    window_start_time: float = field(default=0.0, init=False)  # Set when the first operation starts a window
     operation_position: int = field(default=0, init=False)
     is_server_providing_operation_position: bool = field(default=False, init=False)
     is_leaky_bucket: bool = field(default=True, init=False)
 
     def __post_init__(self):
-        """Calculate when throttling should start after initialization."""
-        self._recalculate_throttle_thresholds()
-
-    def _recalculate_throttle_thresholds(self):
-        """Recalculate the throttle and full throttle trigger counts based on the current rate limits."""
-        self.throttle_trigger_count = math.ceil(self.max_operations_in_window * self.throttle_start_percentage)
-        self.full_throttle_trigger_count = math.ceil(self.max_operations_in_window * self.full_throttle_percentage)
+        """Allocate the timestamp ring buffer after initialization."""
+        self.operation_timestamps = array('d', [0.0]) * self.max_operations_in_window
+
+    @cached_property
+    def throttle_trigger_count(self):
+        """The operation count in the window at which throttling begins."""
+        return math.ceil(self.max_operations_in_window * self.throttle_start_percentage)
+
+    @cached_property
+    def full_throttle_trigger_count(self):
+        """The operation count in the window at which full throttling occurs."""
+        return math.ceil(self.max_operations_in_window * self.full_throttle_percentage)
+
+    def update_limits(self, max_operations_in_window, rate_limit_window):
+        """Update the rate limits, keeping the timestamps still in the window, and invalidate the cached thresholds."""
+        buffer_size = len(self.operation_timestamps)
+        live_timestamps = [
+            self.operation_timestamps[position % buffer_size]
+            for position in range(self.timestamps_head, self.timestamps_tail)
+        ][-max_operations_in_window:]
+
+        self.max_operations_in_window = max_operations_in_window
+        self.rate_limit_window = rate_limit_window
+        self.operation_timestamps = array('d', live_timestamps) + array('d', [0.0]) * (max_operations_in_window - len(live_timestamps))
+        self.timestamps_head = 0
+        self.timestamps_tail = len(live_timestamps)
+
+        self.__dict__.pop('throttle_trigger_count', None)
+        self.__dict__.pop('full_throttle_trigger_count', None)
 
     def _throttle(self):
         """Handle the throttling logic before making an operation."""
-        current_time = time.time()
+        # The unpruned count can only overestimate the window, so below the first throttled position no range can apply
+        if not self.is_server_providing_operation_position:
+            operation_count = self.timestamps_tail - self.timestamps_head
+            if operation_count < min(self.throttle_trigger_count, self.full_throttle_trigger_count - 1):
+                self.operation_position = operation_count
+                return
+
+        current_time = time.monotonic()
         
-        # Remove old operation timestamps that are outside the current time window
-        while self.operation_timestamps and self.operation_timestamps[0] < current_time - self.rate_limit_window:
-            self.operation_timestamps.popleft()
+        # Skip old operation timestamps that are outside the current time window
+        cutoff = current_time - self.rate_limit_window
+        buffer_size = len(self.operation_timestamps)
+        while self.timestamps_head < self.timestamps_tail and self.operation_timestamps[self.timestamps_head % buffer_size] < cutoff:
+            self.timestamps_head += 1
 
         time_elapsed = current_time - self.window_start_time
-        time_remaining = abs(self.rate_limit_window - time_elapsed)
+        time_remaining = self.rate_limit_window - time_elapsed
 
-        # Reset window start time if the current window has expired
-        if time_remaining <= 0:
+        # Start a new window if no window has started yet or the current window has expired
+        if self.window_start_time == 0.0 or time_remaining <= 0:
             self.window_start_time = current_time
+            time_elapsed = 0.0
+            time_remaining = self.rate_limit_window
 
         # Get the position of the current operation in the throttling window
         if not self.is_server_providing_operation_position:
-            print("[Info] Server is not providing operation position. Using local operation count.")
-            self.operation_position = len(self.operation_timestamps)
+            self.operation_position = self.timestamps_tail - self.timestamps_head
+
+        # Work out the longest wait required by the throttle, full throttle, and backoff ranges and sleep once
+        time_to_wait = 0.0
 
         # Apply throttling if within the throttle range
         if self.operation_position >= self.throttle_trigger_count and self.operation_position < self.full_throttle_trigger_count:
             remaining_operations = self.full_throttle_trigger_count - self.operation_position
             
-            print(f"\033[93m[Throttle] Time remaining: {time_remaining:.2f} seconds")
-            print(f"\033[93m[Throttle] Remaining operations: {remaining_operations}")
+            log.info("[Throttle] Time remaining: %.2f seconds. Remaining operations: %d", time_remaining, remaining_operations)
             if self.is_leaky_bucket:
-                time_to_wait = min(time_remaining / max(remaining_operations, 1), self.rate_limit_window)
-                print(f"\033[93m[Throttle] Waiting {time_to_wait:.2f} seconds before making the next operation.\033[0m")
+                time_to_wait = max(time_to_wait, min(time_remaining / max(remaining_operations, 1), self.rate_limit_window))
             else:
-                time_to_wait = min(time_remaining, self.rate_limit_window)
-                print(f"\033[93m[Throttle] Waiting {time_to_wait:.2f} seconds before making the next operation.\033[0m")
-
-            time.sleep(time_to_wait)
+                time_to_wait = max(time_to_wait, min(time_remaining, self.rate_limit_window))
 
         # Fully throttle if at the last position in the throttle range
         if self.operation_position == self.full_throttle_trigger_count - 1:
-            time_to_wait = time_remaining * 1.1  # Add an extra 10% delay as cushion
-            if time_to_wait > 0:
-                print(f"\033[93m[Full Throttle] Waiting {time_to_wait:.2f} seconds to consume remaining time.\033[0m")
-                time.sleep(time_to_wait)
+            time_to_wait = max(time_to_wait, time_remaining * 1.1)  # Add an extra 10% delay as cushion
+            log.info("[Full Throttle] Consuming the remaining time in the window.")
 
         # Apply exponential backoff if the operation count exceeds the full throttle trigger count
         if self.operation_position >= self.full_throttle_trigger_count:
             if time_elapsed < self.rate_limit_window:
-                backoff_time = (self.rate_limit_window - time_elapsed) * 1.5
-                print(f"\033[93m[Backoff] Exponential Backoff: Waiting {backoff_time:.2f} seconds before proceeding.\033[0m")
-                time.sleep(backoff_time)
+                time_to_wait = max(time_to_wait, (self.rate_limit_window - time_elapsed) * 1.5)
+                log.info("[Backoff] Exponential Backoff: Operation count is over the full throttle limit.")
+
+        if time_to_wait > 0:
+            log.info("[Throttle] Waiting %.2f seconds before making the next operation.", time_to_wait)
+            time.sleep(time_to_wait)
 
     def _record_operation(self):
         """Record the current time as an operation timestamp and update the total operation count."""
-        self.operation_timestamps.append(time.time())
+        current_time = time.monotonic()
+        buffer_size = len(self.operation_timestamps)
+
+        # Drop the oldest timestamp when the buffer is full so it is not overwritten while still counted
+        if self.timestamps_tail - self.timestamps_head == buffer_size:
+            self.timestamps_head += 1
+
+        self.operation_timestamps[self.timestamps_tail % buffer_size] = current_time
+        self.timestamps_tail += 1
         self.total_operations_made += 1
         
-        # Reset window start time if this is the first operation in a new cycle
-        if len(self.operation_timestamps) == 1:
-            self.window_start_time = time.time()
+        # Reset window start time if this is the first operation in a new cycle or no window has started yet
+        if self.window_start_time == 0.0 or self.timestamps_tail - self.timestamps_head == 1:
+            self.window_start_time = current_time
 
 
     def _is_transient_error(self, exception):
         """Determine if the error is transient and worth retrying."""
         if isinstance(exception, (Timeout, ConnectionError)):
-            print(f"\033[91mIs transient error: Connection\033[0m")
+            log.debug("Is transient error: Connection")
             return True  # Retry for connection-related errors
 
         if isinstance(exception, HTTPError):
-            print(f"\033[91mIs transient error: HTTP\033[0m")
+            log.debug("Is transient error: HTTP")
             status_code = exception.response.status_code
             if status_code in {429, 503}:  # Rate limiting or temporary unavailability
                 return True
@@ -127,11 +169,11 @@ class PackageThrottler(_PackageThrottlerDefaultsBase, _PackageThrottlerBase):
                 return True
             
         if self.transient_exceptions and isinstance(exception, self.transient_exceptions):
-            print(f"\033[91mIs transient error: Custom\033[0m")
+            log.debug("Is transient error: Custom")
             return True
 
         # Customize with additional checks as needed for your client
-        print(f"\033[91mIs not transient error\033[0m")
+        log.debug("Is not transient error")
         return False
 
     
@@ -151,10 +193,10 @@ class PackageThrottler(_PackageThrottlerDefaultsBase, _PackageThrottlerBase):
     
             # Handle transient errors with exponential backoff and jitter
             except Exception as err:
-                print(f"OperationError: {err}")
+                log.warning("OperationError: %s", err)
                 if self._is_transient_error(err):
                     backoff_time = self.base_backoff_delay * (backoff_factor ** attempt) + random.uniform(0, 1)
-                    print(f"\033[93m[Rate Limit Hit] Backoff: Waiting {backoff_time:.2f} seconds before retrying.\033[0m")
+                    log.info("[Rate Limit Hit] Backoff: Waiting %.2f seconds before retrying.", backoff_time)
                     time.sleep(backoff_time)
                 else:
                     raise
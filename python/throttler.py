@@ -1,174 +1,287 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import InitVar, dataclass, field
+from email.utils import parsedate_to_datetime
+import logging
 import math
-from pprint import pprint
+import threading
 import time
-from collections import deque
 import random
 import requests
 
+log = logging.getLogger(__name__)
+
+# Status codes that are always worth retrying, in addition to 5xx server errors
+_TRANSIENT_STATUS_CODES: frozenset[int] = frozenset({408, 429})
+
+@dataclass(slots=True)
+class TokenBucket:
+    """
+    A token bucket that refills continuously and reports how long a caller must wait for each token.
+    It is safe to share between threads: callers take a token under the lock and sleep outside it.
+
+    Attributes:
+        capacity (float): The maximum number of tokens the bucket can hold.
+        rate (float): The number of tokens added to the bucket per second.
+    """
+    capacity: float
+    rate: float
+    tokens: float = field(init=False)
+    last_refill: float = field(default_factory=time.monotonic, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        """Start with a full bucket."""
+        self.tokens = self.capacity
+
+    def acquire(self):
+        """Take a token from the bucket and return how long to wait in seconds until it is available."""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate) - 1
+            self.tokens = tokens
+            self.last_refill = now
+
+            # A negative balance is the time still owed to the bucket, so the next refill accounts for the wait
+            if tokens < 0:
+                return -tokens / self.rate
+            return 0.0
+
+    def reset(self, tokens):
+        """Lower the number of available tokens to `tokens`, for example from the remaining count reported by a server.
+
+        The count is never raised, so a stale response that arrives out of order cannot refill the bucket.
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.tokens = min(available, tokens)
+            self.last_refill = now
+
+    def update_limits(self, capacity, rate):
+        """Change the capacity and refill rate, keeping at most `capacity` of the current tokens."""
+        with self._lock:
+            self.capacity = capacity
+            self.rate = rate
+            self.tokens = min(self.tokens, capacity)
+
+# Token buckets shared by every throttler of the same class in the process that uses the same key, such as an API key
+_SHARED_BUCKETS: dict[tuple[type, str], TokenBucket] = {}
+_SHARED_BUCKETS_LOCK = threading.Lock()
+
 @dataclass
 class _RequestThrottlerDefaultsBase:
     """Default values for the RequestThrottler class."""
     max_requests_in_window: int = 10  # requests per window
     rate_limit_window: int = 1  # in seconds
-    throttle_start_percentage: float = 0.75  # Start throttling at 75% of the limit
-    full_throttle_percentage: float = 0.90  # Fully throttle at 90% of the limit
+    max_backoff: float = 60.0  # Maximum delay in seconds between retries
+    use_rate_limit_headers: bool = False  # Follow the server's X-RateLimit-* headers
+    burst_percentage: float = 0.25  # Share of the window's requests that may be sent at once
 
 @dataclass
 class RequestThrottler(_RequestThrottlerDefaultsBase):
     """
-    A class that throttles requests with exponential backoff, jitter, and dynamic throttling thresholds.
+    A class that throttles requests with a token bucket, exponential backoff, and jitter.
+
+    The bucket holds up to `max_requests_in_window * burst_percentage` tokens and refills the rest of
+    the window's budget continuously, at `max_requests_in_window * (1 - burst_percentage) / rate_limit_window`
+    tokens per second. Every request takes one token and waits only when the bucket is empty, so a burst
+    plus the refill during one window never exceeds `max_requests_in_window`.
 
     Attributes:
         max_requests_in_window (int): The maximum number of requests allowed within a single time window.
         rate_limit_window (int): The duration of the time window in seconds. Default is 1 second.
-        throttle_start_percentage (float): The percentage of the max requests in the window at which throttling begins.
-                                            Default is 0.75 (75%).
-        full_throttle_percentage (float): The percentage of the max requests in the window at which full throttling occurs.
-                                          Default is 0.90 (90%).
+        max_backoff (float): The maximum delay in seconds between retries when no Retry-After header is given.
+                             Default is 60 seconds.
+        use_rate_limit_headers (bool): Whether to follow the server's X-RateLimit-Limit and X-RateLimit-Remaining
+                                       headers. Only enable this when the server's window matches
+                                       `rate_limit_window`. Default is False.
+        burst_percentage (float): The share of `max_requests_in_window` that may be sent at once before
+                                  requests are paced, between 0 and 1. Default is 0.25 (25%).
     """
     
-    throttle_trigger_count: int = field(init=False)
-    full_throttle_trigger_count: int = field(init=False)
-    request_timestamps: deque = field(default_factory=deque, init=False)
     total_requests_made: int = field(default=0, init=False)
-    window_start_time: float = field(default_factory=time.time, init=False)
-    request_position: int = field(default=0, init=False)
-    is_server_providing_request_position: bool = field(default=False, init=False)
-    is_leaky_bucket: bool = field(default=True, init=False)
+    bucket: TokenBucket = field(init=False)
+    _session: requests.Session = field(default_factory=requests.Session, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    # Names of the session methods used for each supported HTTP method
+    _METHOD_MAP = {
+        'GET': 'get',
+        'POST': 'post',
+        'PUT': 'put',
+        'PATCH': 'patch',
+        'DELETE': 'delete'
+    }
 
     def __post_init__(self):
-        """Calculate when throttling should start after initialization."""
-        self._recalculate_throttle_thresholds()
+        """Create a full token bucket for the configured rate limit."""
+        self.bucket = TokenBucket(*self._bucket_limits(self.max_requests_in_window, self.rate_limit_window))
+
+    def update_limits(self, max_requests_in_window, rate_limit_window):
+        """Update the rate limits and the capacity and refill rate of the token bucket."""
+        self.max_requests_in_window = max_requests_in_window
+        self.rate_limit_window = rate_limit_window
+        self.bucket.update_limits(*self._bucket_limits(max_requests_in_window, rate_limit_window))
+
+    def _bucket_limits(self, max_requests_in_window, rate_limit_window):
+        """Return the token bucket capacity and refill rate that keep any window within the given rate limit."""
+        if not 0 < self.burst_percentage < 1:
+            raise ValueError("burst_percentage must be between 0 and 1")
+
+        # The burst and the refill during one window together add up to the limit
+        capacity = max_requests_in_window * self.burst_percentage
+        return capacity, (max_requests_in_window - capacity) / rate_limit_window
+
+    def _has_bucket_limits(self, max_requests_in_window, rate_limit_window):
+        """Check whether the token bucket already enforces the given rate limit."""
+        capacity, rate = self._bucket_limits(max_requests_in_window, rate_limit_window)
+        return math.isclose(capacity, self.bucket.capacity) and math.isclose(rate, self.bucket.rate)
+
+    def _share_bucket(self, key):
+        """Use the token bucket shared by every throttler of this class with the same key, creating it on first use.
+
+        A throttler joining an existing bucket lowers it to its own limits when they are more restrictive.
+        """
+        # Namespace the key by class so the same key used with different services gets separate limits
+        shared_key = (type(self), key)
+        capacity, rate = self._bucket_limits(self.max_requests_in_window, self.rate_limit_window)
+        with _SHARED_BUCKETS_LOCK:
+            bucket = _SHARED_BUCKETS.get(shared_key)
+            if bucket is None:
+                bucket = _SHARED_BUCKETS[shared_key] = TokenBucket(capacity, rate)
+            elif capacity < bucket.capacity or rate < bucket.rate:
+                log.debug("Lowering the shared rate limit to the more restrictive limit of %s.", type(self).__name__)
+                bucket.update_limits(min(capacity, bucket.capacity), min(rate, bucket.rate))
+        self.bucket = bucket
 
-    def _recalculate_throttle_thresholds(self):
-        """Recalculate the throttle and full throttle trigger counts based on the current rate limits."""
-        self.throttle_trigger_count = math.ceil(self.max_requests_in_window * self.throttle_start_percentage)
-        self.full_throttle_trigger_count = math.ceil(self.max_requests_in_window * self.full_throttle_percentage)
+    def close(self):
+        """Close the underlying requests session and its pooled connections."""
+        self._session.close()
 
     def _throttle(self):
         """Handle the throttling logic before making a request."""
-        current_time = time.time()
-        
-        # Remove old request timestamps that are outside the current time window
-        while self.request_timestamps and self.request_timestamps[0] < current_time - self.rate_limit_window:
-            self.request_timestamps.popleft()
-
-        time_elapsed = current_time - self.window_start_time
-        time_remaining = abs(self.rate_limit_window - time_elapsed)
-
-        # Reset window start time if the current window has expired
-        if time_remaining <= 0:
-            self.window_start_time = current_time
-
-        # Get the position of the current request in the throttling window
-        if not self.is_server_providing_request_position:
-            print("[Info] Server is not providing request position. Using local request count.")
-            self.request_position = len(self.request_timestamps)
-
-        # Apply throttling if within the throttle range
-        if self.request_position >= self.throttle_trigger_count and self.request_position < self.full_throttle_trigger_count:
-            remaining_requests = self.full_throttle_trigger_count - self.request_position
-            
-            print(f"\033[93m[Throttle] Time remaining: {time_remaining:.2f} seconds")
-            print(f"\033[93m[Throttle] Remaining requests: {remaining_requests}")
-            if self.is_leaky_bucket:
-                time_to_wait = min(time_remaining / max(remaining_requests, 1), self.rate_limit_window)
-                print(f"\033[93m[Throttle] Waiting {time_to_wait:.2f} seconds before making the next request.\033[0m")
-            else:
-                time_to_wait = min(time_remaining, self.rate_limit_window)
-                print(f"\033[93m[Throttle] Waiting {time_to_wait:.2f} seconds before making the next request.\033[0m")
-
-            time.sleep(time_to_wait)
-
-        # Fully throttle if at the last position in the throttle range
-        if self.request_position == self.full_throttle_trigger_count - 1:
-            time_to_wait = time_remaining * 1.1  # Add an extra 10% delay as cushion
-            if time_to_wait > 0:
-                print(f"\033[93m[Full Throttle] Waiting {time_to_wait:.2f} seconds to consume remaining time.\033[0m")
-                time.sleep(time_to_wait)
-
-        # Apply exponential backoff if the request count exceeds the full throttle trigger count
-        if self.request_position >= self.full_throttle_trigger_count:
-            if time_elapsed < self.rate_limit_window:
-                backoff_time = (self.rate_limit_window - time_elapsed) * 1.5
-                print(f"\033[93m[Backoff] Exponential Backoff: Waiting {backoff_time:.2f} seconds before proceeding.\033[0m")
-                time.sleep(backoff_time)
+        delay = self.bucket.acquire()
+        if delay > 0:
+            time.sleep(delay)
 
     def _record_request(self):
-        """Record the current time as a request timestamp and update the total request count."""
-        self.request_timestamps.append(time.time())
-        self.total_requests_made += 1
-        
-        # Reset window start time if this is the first request in a new cycle
-        if len(self.request_timestamps) == 1:
-            self.window_start_time = time.time()
+        """Update the total request count."""
+        with self._lock:
+            self.total_requests_made += 1
 
     def _is_transient_error(self, status_code, response):
         """Determine if the error is transient and worth retrying."""
-        transient_errors = {408, 429}
-        if status_code in transient_errors:
-            return True
-        if 500 <= status_code < 600:
-            return True
-        if status_code == 403 and 'Retry-After' in response.headers:
-            return True
-        return False
+        return self._is_transient_status(status_code, response.headers)
+
+    def _is_transient_status(self, status_code, headers):
+        """Determine if a status code and its response headers indicate a transient error."""
+        return (
+            status_code in _TRANSIENT_STATUS_CODES
+            or 500 <= status_code < 600
+            or (status_code == 403 and 'Retry-After' in headers)
+        )
     
+    def _parse_retry_after(self, retry_after_value):
+        """Convert a Retry-After value, given in seconds or as an HTTP-date, to seconds. Return None if it cannot be parsed."""
+        try:
+            return max(0, int(retry_after_value))
+        except ValueError:
+            pass
+
+        try:
+            retry_after_date = parsedate_to_datetime(retry_after_value)
+        except (TypeError, ValueError):
+            return None
+        return max(0, retry_after_date.timestamp() - time.time())
+
+    def _prepare_request(self, method, url, headers, params, data, json):
+        """Return the headers, params, data, and json to send. Override to add authentication or defaults.
+
+        Arguments the caller did not pass are None, which requests leaves out of the request.
+        """
+        return headers, params, data, json
+
+    def _update_from_headers(self, response):
+        """Align the bucket with the server's X-RateLimit-Limit and X-RateLimit-Remaining headers when enabled."""
+        if not self.use_rate_limit_headers:
+            return
+
+        try:
+            limit = int(response.headers['X-RateLimit-Limit'])
+            if not self._has_bucket_limits(limit, self.rate_limit_window):
+                self.update_limits(limit, self.rate_limit_window)
+        except (KeyError, ValueError):
+            pass
+
+        # The server's remaining count can only lower the local estimate
+        try:
+            self.bucket.reset(int(response.headers['X-RateLimit-Remaining']))
+        except (KeyError, ValueError):
+            pass
+
+    def _on_success(self, response):
+        """Handle a successful response. Override to log response details or read other headers."""
+        self._update_from_headers(response)
+
+    def _on_transient_error(self, error):
+        """Handle a transient error before the request is retried. Override to switch API keys or reset state."""
+        pass
+
+    def _calculate_backoff_time(self, attempt, backoff_factor, error):
+        """Return the delay in seconds before retrying after `error` when the server does not send Retry-After."""
+        return min(self.max_backoff, (backoff_factor ** (attempt + 1)) + random.uniform(0, 1))
+
     def _make_request(self, method, url, headers=None, params=None, data=None, json=None, retries=3, backoff_factor=2):
         """Make a request with retries using exponential backoff and jitter."""
-        headers = headers or {}
-        params = params or {}
-        data = data or {}
-        json = json or {}
-    
-        method_map = {
-            'GET': requests.get,
-            'POST': requests.post,
-            'PUT': requests.put,
-            'PATCH': requests.patch,
-            'DELETE': requests.delete
-        }
-    
-        if method not in method_map:
+        if method not in self._METHOD_MAP:
             raise ValueError("Unsupported HTTP method")
+
+        request = getattr(self._session, self._METHOD_MAP[method])
+        headers, params, data, json = self._prepare_request(method, url, headers, params, data, json)
     
         for attempt in range(retries):
             self._throttle()
     
             # Make the request
             try:
-                response = method_map[method](url, headers=headers, params=params, data=data)
-
-                try:
-                    response.raise_for_status()
-                except Exception as e:
-                    pprint(response.headers)
-                    raise e
+                response = request(url, headers=headers, params=params, data=data, json=json)
+                response.raise_for_status()
                 self._record_request()
+                self._on_success(response)
                 return response
     
             # Handle HTTP errors
             except requests.exceptions.HTTPError as http_err:
-                print(f"HTTPError: {http_err}")
+                log.warning("HTTPError: %s", http_err)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Response headers: %s", dict(http_err.response.headers))
                 if not self._is_transient_error(http_err.response.status_code, http_err.response):
                     raise
 
+                # Surface the error right away once no retries are left
+                if attempt >= retries - 1:
+                    raise
+
+                self._on_transient_error(http_err)
+
+                retry_after = None
                 if 'Retry-After' in http_err.response.headers:
-                    retry_after = int(http_err.response.headers['Retry-After'])
-                    print(f"Response has Retry-After header. ")
-                    print(f"Retrying after {retry_after} seconds.")
+                    retry_after = self._parse_retry_after(http_err.response.headers['Retry-After'])
+
+                if retry_after is not None:
+                    log.info("Response has Retry-After header. Retrying after %s seconds.", retry_after)
                     time.sleep(retry_after)
-                elif attempt < retries:
-                    sleep_time = (backoff_factor ** (attempt + 1)) + random.uniform(0, 1)
-                    time.sleep(sleep_time)
                 else:
-                    raise
+                    sleep_time = self._calculate_backoff_time(attempt, backoff_factor, http_err)
+                    log.info("Retrying in %.2f seconds.", sleep_time)
+                    time.sleep(sleep_time)
     
             except requests.exceptions.RequestException as req_err:
-                print(f"RequestException: {req_err}")
-                if attempt < retries:
-                    sleep_time = (backoff_factor ** attempt + 1) + random.uniform(0, 1)
+                log.warning("RequestException: %s", req_err)
+                if attempt < retries - 1:
+                    self._on_transient_error(req_err)
+                    sleep_time = self._calculate_backoff_time(attempt, backoff_factor, req_err)
+                    log.info("Retrying in %.2f seconds.", sleep_time)
                     time.sleep(sleep_time)
                 else:
                     raise
@@ -177,6 +290,12 @@ class RequestThrottler(_RequestThrottlerDefaultsBase):
         """Throttled GET request."""
         return self._make_request('GET', url, headers=headers, params=params)
 
+    def throttled_get_many(self, urls, headers=None, params=None, max_workers=10):
+        """Throttled GET requests for several URLs made concurrently from a thread pool, returned in order."""
+        # The default of 10 workers matches the connection pool size of a requests.Session
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda url: self.throttled_get(url, headers=headers, params=params), urls))
+
     def throttled_post(self, url, data=None, json=None, headers=None, params=None):
         """Throttled POST request."""
         return self._make_request('POST', url, headers=headers, params=params, data=data, json=json)